@@ -1,5 +1,7 @@
 import re
 
+import numpy as np
+
 
 class Alphabet():
 
@@ -8,9 +10,6 @@ class Alphabet():
         self.alphabet = []
         self.translator = dict()
 
-        # Iteration
-        self.current = -1
-
     def __contains__(self, key):
         return key in self.counts
 
@@ -30,16 +29,7 @@ class Alphabet():
         return len(self.alphabet)
 
     def __iter__(self):
-        return self
-
-    def __next__(self):
-        if self.current >= len(self.alphabet)-1:
-            raise StopIteration
-        else:
-            self.current += 1
-        return self.alphabet[self.current]
-
-    next = __next__
+        return iter(self.alphabet)
 
     def append(self, item, count = 0):
         self.alphabet.append(item)
@@ -49,54 +39,134 @@ class Alphabet():
         for key in self.counts:
             self.counts[key] = 0
 
+    def _count_array(self, keys=None):
+        ''' Returns the counts of keys (default: all the items) as an int64 array '''
+        if keys is None:
+            return np.fromiter(self.counts.values(), dtype=np.int64, count=len(self.counts))
+        return np.fromiter(map(self.counts.__getitem__, keys), dtype=np.int64, count=len(keys))
+
+    def _keys(self):
+        ''' Returns the items, in translated order if the alphabet is translated '''
+        if self.alphabet and len(self.alphabet) == len(self.counts):
+            return self.alphabet
+        return self.counts.keys()
+
+    def _set(self, counts, first_item=0):
+        ''' Sets the counts (a dict) and translates, in descending count order '''
+        keys = list(counts)
+        values = np.fromiter(counts.values(), dtype=np.int64, count=len(counts))
+        if np.all(values[:-1] >= values[1:]):
+            # eg. a subset of a translated alphabet
+            self.alphabet = keys
+            self.counts = counts
+        else:
+            order = np.argsort(-values, kind='mergesort')
+            self.alphabet = [keys[i] for i in order.tolist()]
+            self.counts = dict(zip(self.alphabet, values[order].tolist()))
+        self.translator = {key: (idx + first_item) for idx, key in enumerate(self.alphabet)}
+        return self
+
     def translate(self, first_item=0):
-        sorted_alphabet = sorted(
-            self.counts.items(), key=lambda kv: kv[1], reverse=True)
-        self.alphabet = [e[0] for e in sorted_alphabet]
+        keys = list(self.counts.keys())
+        order = np.argsort(-self._count_array(), kind='mergesort')
+        self.alphabet = [keys[i] for i in order.tolist()]
         self.translator = {key: (idx + first_item) for idx, key in enumerate(self.alphabet)}
 
     def translate_item(self, item):
         return self.translator[item]
 
     def keep_n(self, n):
-        self.alphabet = self.alphabet[:n]
-
-        new_counts = dict()
-        for word in self.alphabet:
-            new_counts[word] = self.counts[word]
+        if self._keys() is self.alphabet:
+            # already translated, so the alphabet is sorted by count
+            self.alphabet = self.alphabet[:max(0, n)]
+            self.counts = {key: self.counts[key] for key in self.alphabet}
+            self.translator = {key: idx for idx, key in enumerate(self.alphabet)}
+            return
+
+        keys = list(self.counts.keys())
+        counts = self._count_array()
+
+        if n <= 0:
+            kept = np.zeros(0, dtype=np.int64)
+        elif n < len(counts):
+            # top n without a full sort, ties resolved by insertion order
+            threshold = counts[np.argpartition(-counts, n - 1)[n - 1]]
+            above = np.flatnonzero(counts > threshold)
+            tied = np.flatnonzero(counts == threshold)[:max(0, n - len(above))]
+            kept = np.sort(np.concatenate((above, tied)))
+        else:
+            kept = np.arange(len(counts))
 
-        self.counts = new_counts
-        self.translator = {key: idx for idx, key in enumerate(self.alphabet)}
+        self._set(dict(zip([keys[i] for i in kept.tolist()], counts[kept].tolist())))
 
     def keep_min_frequency(self, f):
-        self.alphabet = [e for e in self.alphabet if self.counts[e] >= f]
-
-        new_counts = dict()
-        for word in self.alphabet:
-            new_counts[word] = self.counts[word]
-
-        self.counts = new_counts
-        self.translator = {key: idx for idx, key in enumerate(self.alphabet)}
+        self.prune(min_frequency=f)
+
+    def prune(self, min_frequency=None, max_frequency=None):
+        ''' Removes the items with counts outside [min_frequency, max_frequency] '''
+        keys = list(self.counts.keys())
+        counts = self._count_array()
+
+        mask = np.ones(len(counts), dtype=bool)
+        if min_frequency is not None:
+            mask &= counts >= min_frequency
+        if max_frequency is not None:
+            mask &= counts <= max_frequency
+
+        kept = np.flatnonzero(mask)
+        self._set(dict(zip([keys[i] for i in kept.tolist()], counts[kept].tolist())))
+
+    @staticmethod
+    def _combine(counts_a, counts_b, counts):
+        if counts == 'keep':
+            return counts_a
+        elif counts == 'take':
+            return counts_b
+        elif counts == 'add':
+            return counts_a + counts_b
+        else:
+            raise ValueError('Unknown value for arg counts.')
 
     def intersect(self, alphabet, counts='keep'):
         '''Intersect with another alphabet and return the resulting alphabet'''
-        intersection = Alphabet()
-
-        for item in self:
-            if item in alphabet:
-                count = None
-                if counts == 'keep':
-                    count = self.counts[item]
-                elif counts == 'take':
-                    count = alphabet.counts[item]
-                elif counts == 'add':
-                    count = self.counts[item] + alphabet.counts[item]
-                else:
-                    raise ValueError('Unknown value for arg counts.')
-
-                intersection.append(item,count)
-        intersection.translate()
-        return intersection
+        if counts == 'keep':
+            return Alphabet()._set({key: self.counts[key] for key in self._keys()
+                                    if key in alphabet.counts})
+
+        keys = [key for key in self._keys() if key in alphabet.counts]
+        return Alphabet()._set(dict(zip(keys, self._combine(
+            self._count_array(keys), alphabet._count_array(keys), counts).tolist())))
+
+    def union(self, alphabet, counts='add'):
+        '''Union with another alphabet. counts applies to the items present in both'''
+        shared = [key for key in self.counts if key in alphabet.counts]
+
+        new_counts = self.counts.copy()
+        new_counts.update(zip(shared, self._combine(self._count_array(shared),
+                                                    alphabet._count_array(shared), counts).tolist()))
+        new_counts.update((key, count) for key, count in alphabet.counts.items()
+                          if key not in self.counts)
+        return Alphabet()._set(new_counts)
+
+    def difference(self, alphabet):
+        '''Returns the items not present in the other alphabet, with their counts'''
+        return Alphabet()._set({key: self.counts[key] for key in self._keys()
+                                if key not in alphabet.counts})
+
+    @staticmethod
+    def union_all(alphabets):
+        '''Union of many alphabets (eg. shards), adding their counts'''
+        # integer code of every key, in order of first appearance
+        code = dict()
+        codes = []
+        for alphabet in alphabets:
+            codes.append(np.fromiter((code.setdefault(key, len(code)) for key in alphabet.counts),
+                                     dtype=np.int64, count=len(alphabet.counts)))
+
+        counts = np.zeros(len(code), dtype=np.int64)
+        for alphabet_codes, alphabet in zip(codes, alphabets):
+            counts[alphabet_codes] += alphabet._count_array()
+        return Alphabet()._set(dict(zip(code, counts.tolist())))
 
     def to_string(self, separator=" "):
         out_str = "SI:" + str(len(self)) + "\n"
@@ -153,3 +223,172 @@ class Alphabet():
             self.translator = {key: idx for idx, key in enumerate(self.alphabet)}
 
         return self
+
+
+class LabelAlphabet():
+    ''' Item counts per label, accumulated in a single pass.
+
+    counts[l, i] is the number of occurrences of item i in rows with label l,
+    doc_counts[l, i] the number of those rows that contain it and label_counts[l]
+    the number of rows with label l. Buffered rows are added when these are read.
+    '''
+
+    def __init__(self, batch_size=1000000):
+        self.labels = []
+        self.items = []
+        self._label_idx = dict()
+        self._item_idx = dict()
+
+        # tables grow geometrically, only [:len(labels), :len(items)] is used
+        self._counts = np.zeros((0, 0), dtype=np.int64)
+        self._doc_counts = np.zeros((0, 0), dtype=np.int64)
+        self._label_counts = np.zeros(0, dtype=np.int64)
+
+        # (label, item) pairs buffered before adding them to the tables
+        self.batch_size = batch_size
+        self._pair_labels = []
+        self._pair_items = []
+        self._doc_labels = []
+        self._doc_items = []
+        self._row_labels = []
+
+    def __len__(self):
+        return len(self.items)
+
+    def add(self, itemset):
+        label = self._label_idx.get(itemset.label)
+        if label is None:
+            label = self._label_idx[itemset.label] = len(self.labels)
+            self.labels.append(itemset.label)
+        self._row_labels.append(label)
+
+        ids = []
+        for item in itemset.items:
+            idx = self._item_idx.get(item)
+            if idx is None:
+                idx = self._item_idx[item] = len(self.items)
+                self.items.append(item)
+            ids.append(idx)
+
+        self._pair_items.extend(ids)
+        self._pair_labels.extend([label] * len(ids))
+        unique_ids = set(ids)
+        self._doc_items.extend(unique_ids)
+        self._doc_labels.extend([label] * len(unique_ids))
+
+        if len(self._pair_items) >= self.batch_size:
+            self._flush()
+
+    def update(self, dataset):
+        for itemset in dataset._elements:
+            self.add(itemset)
+        self._flush()
+        return self
+
+    @property
+    def counts(self):
+        self._flush()
+        return self._counts[:len(self.labels), :len(self.items)]
+
+    @property
+    def doc_counts(self):
+        self._flush()
+        return self._doc_counts[:len(self.labels), :len(self.items)]
+
+    @property
+    def label_counts(self):
+        self._flush()
+        return self._label_counts[:len(self.labels)]
+
+    def _reserve(self, table):
+        ''' Returns the table, reallocated with doubled capacity if it is too small '''
+        shape = (len(self.labels), len(self.items))
+        if shape[0] <= table.shape[0] and shape[1] <= table.shape[1]:
+            return table
+        grown = np.zeros((max(shape[0], 2 * table.shape[0]), max(shape[1], 2 * table.shape[1])),
+                         dtype=np.int64)
+        grown[:table.shape[0], :table.shape[1]] = table
+        return grown
+
+    def _flush(self):
+        if not self._row_labels:
+            return
+
+        self._counts = self._reserve(self._counts)
+        np.add.at(self._counts, (np.array(self._pair_labels, dtype=np.int64),
+                                 np.array(self._pair_items, dtype=np.int64)), 1)
+        self._doc_counts = self._reserve(self._doc_counts)
+        np.add.at(self._doc_counts, (np.array(self._doc_labels, dtype=np.int64),
+                                     np.array(self._doc_items, dtype=np.int64)), 1)
+
+        if len(self.labels) > len(self._label_counts):
+            label_counts = np.zeros(max(len(self.labels), 2 * len(self._label_counts)), dtype=np.int64)
+            label_counts[:len(self._label_counts)] = self._label_counts
+            self._label_counts = label_counts
+        np.add.at(self._label_counts, np.array(self._row_labels, dtype=np.int64), 1)
+
+        self._pair_labels = []
+        self._pair_items = []
+        self._doc_labels = []
+        self._doc_items = []
+        self._row_labels = []
+
+    def document_frequency(self):
+        ''' Number of rows containing every item '''
+        return self.doc_counts.sum(axis=0)
+
+    def chi2(self):
+        ''' Chi-square statistic of item presence against every label, shape (labels, items) '''
+        n = self.label_counts.sum()
+        a = self.doc_counts.astype(np.float64)
+        b = self.document_frequency()[None, :] - a
+        c = self.label_counts[:, None] - a
+        d = n - a - b - c
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            chi2 = n * (a * d - b * c) ** 2 / ((a + c) * (b + d) * (a + b) * (c + d))
+        return np.nan_to_num(chi2)
+
+    def mutual_information(self):
+        ''' Mutual information between item presence and the label, per item '''
+        n = float(self.label_counts.sum())
+        p_label = self.label_counts[:, None] / n
+        p_item = self.document_frequency()[None, :] / n
+
+        mi = np.zeros(len(self.items))
+        for joint, p in ((self.doc_counts / n, p_item),
+                         ((self.label_counts[:, None] - self.doc_counts) / n, 1 - p_item)):
+            with np.errstate(divide='ignore', invalid='ignore'):
+                terms = joint * np.log(joint / (p_label * p))
+            mi += np.nan_to_num(terms).sum(axis=0)
+        return mi
+
+    def scores(self, score='chi2'):
+        ''' Returns a score per item: chi2 (max over labels), mi or df '''
+        if score == 'chi2':
+            return self.chi2().max(axis=0)
+        elif score == 'mi':
+            return self.mutual_information()
+        elif score == 'df':
+            return self.document_frequency()
+        else:
+            raise ValueError('Unknown value for arg score.')
+
+    def to_alphabet(self):
+        ''' Returns a regular Alphabet with the global item counts '''
+        alphabet = Alphabet()
+        alphabet.counts = dict(zip(self.items, self.counts.sum(axis=0).tolist()))
+        alphabet.translate()
+        return alphabet
+
+    def keep_top_by_score(self, n, score='chi2'):
+        ''' Returns a translated Alphabet with the n items with the highest score '''
+        scores = self.scores(score)
+        totals = self.counts.sum(axis=0)
+
+        top = np.argsort(-scores, kind='mergesort')[:n]
+
+        alphabet = Alphabet()
+        alphabet.counts = {self.items[i]: int(totals[i]) for i in top}
+        alphabet.translate()
+        return alphabet
@@ -0,0 +1,89 @@
+''' Compares the Alphabet set algebra against the former item by item implementation.
+
+Run from the directory containing the itemizer package:
+    python -m itemizer.benchmarks.alphabet
+'''
+import random
+import timeit
+
+from itemizer.alphabet import Alphabet
+
+
+def loop_translate(counts):
+    ''' Translation as done by Alphabet.translate before vectorization '''
+    alphabet = [e[0] for e in sorted(counts.items(), key=lambda kv: kv[1], reverse=True)]
+    return alphabet, {key: idx for idx, key in enumerate(alphabet)}
+
+
+def loop_intersect(alphabet_a, counts_a, counts_b):
+    ''' Intersection as done by Alphabet.intersect before vectorization '''
+    alphabet = []
+    counts = dict()
+    for item in alphabet_a:
+        if item in counts_b:
+            alphabet.append(item)
+            counts[item] = counts_a[item]
+    return loop_translate(counts), counts
+
+
+def loop_keep_n(alphabet, n):
+    ''' Pruning as done by Alphabet.keep_n before vectorization '''
+    alphabet.alphabet = alphabet.alphabet[:n]
+    new_counts = dict()
+    for word in alphabet.alphabet:
+        new_counts[word] = alphabet.counts[word]
+    alphabet.counts = new_counts
+    alphabet.translator = {key: idx for idx, key in enumerate(alphabet.alphabet)}
+
+
+def random_alphabet(rndm, n_items, first):
+    alphabet = Alphabet()
+    alphabet.counts = {'w{}'.format(i): rndm.randint(1, 1000) for i in range(first, first + n_items)}
+    alphabet.translate()
+    return alphabet
+
+
+def copy(alphabet):
+    new = Alphabet()
+    new.counts = dict(alphabet.counts)
+    new.alphabet = list(alphabet.alphabet)
+    new.translator = dict(alphabet.translator)
+    return new
+
+
+def best(function, repeat=3):
+    return min(timeit.repeat(function, number=1, repeat=repeat))
+
+
+def best_in_place(function, alphabet, repeat=3):
+    ''' Times a function that modifies the alphabet, on a fresh copy every time '''
+    times = []
+    for _ in range(repeat):
+        pruned = copy(alphabet)
+        times.append(timeit.timeit(lambda: function(pruned), number=1))
+    return min(times)
+
+
+def main(n_items=1000000, seed=0):
+    rndm = random.Random(seed)
+    # the alphabets share half of their items
+    a = random_alphabet(rndm, n_items, 0)
+    b = random_alphabet(rndm, n_items, n_items // 2)
+
+    (expected, _), _ = loop_intersect(a.alphabet, a.counts, b.counts)
+    assert expected == a.intersect(b).alphabet
+
+    print('items: {}'.format(n_items))
+    print('{:10} loop: {:.3f}s  Alphabet: {:.3f}s'.format(
+        'intersect', best(lambda: loop_intersect(a.alphabet, a.counts, b.counts)),
+        best(lambda: a.intersect(b))))
+    print('{:10} loop: {:.3f}s  Alphabet: {:.3f}s'.format(
+        'keep_n', best_in_place(lambda alphabet: loop_keep_n(alphabet, n_items // 2), a),
+        best_in_place(lambda alphabet: alphabet.keep_n(n_items // 2), a)))
+    print('{:10} Alphabet: {:.3f}s'.format('union', best(lambda: a.union(b))))
+    print('{:10} Alphabet: {:.3f}s'.format('difference', best(lambda: a.difference(b))))
+    print('{:10} Alphabet: {:.3f}s'.format('union_all', best(lambda: Alphabet.union_all([a, b, a]))))
+
+
+if __name__ == '__main__':
+    main()
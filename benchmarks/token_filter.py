@@ -0,0 +1,57 @@
+''' Compares the TokenFilter decisions against the former list based filtering.
+
+Run from the directory containing the itemizer package:
+    python -m itemizer.benchmarks.token_filter
+'''
+import re
+import random
+import timeit
+
+from itemizer.operations.token_filter import TokenFilter
+
+
+def list_keep(word, pos, stop_words, stop_regexes, pos_filter):
+    ''' Filtering as done by ProcessorTokenize before TokenFilter '''
+    if pos in pos_filter:
+        return False
+    if word in stop_words:
+        return False
+    for regex in stop_regexes:
+        if re.match(regex, word):
+            return False
+    return True
+
+
+def main(n_stop_words=3000, n_regexes=20, n_tokens=200000, vocabulary=20000, seed=0):
+    rndm = random.Random(seed)
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+
+    def random_word():
+        return ''.join(rndm.choice(letters) for _ in range(rndm.randint(2, 9)))
+
+    words = [random_word() for _ in range(vocabulary)]
+    stop_words = rndm.sample(words, n_stop_words)
+    stop_regexes = ['^' + random_word() + '.*' for _ in range(n_regexes)]
+    pos_tags = ['NN', 'NNS', 'VB', 'VBD', 'JJ', 'RB', 'DT', 'IN', 'PRP', 'CC']
+    pos_filter = ['DT', 'IN', 'CC']
+    tokens = [(rndm.choice(words), rndm.choice(pos_tags)) for _ in range(n_tokens)]
+
+    token_filter = TokenFilter(
+        stop_words=stop_words + ['rgx:' + regex for regex in stop_regexes],
+        pos_filter='^' + '|'.join(pos_filter))
+
+    expected = [list_keep(w, p, stop_words, stop_regexes, pos_filter) for w, p in tokens]
+    assert expected == [token_filter.keep(w, p) for w, p in tokens]
+
+    list_time = timeit.timeit(
+        lambda: [list_keep(w, p, stop_words, stop_regexes, pos_filter) for w, p in tokens], number=1)
+    filter_time = timeit.timeit(
+        lambda: [token_filter.keep(w, p) for w, p in tokens], number=1)
+
+    print('tokens: {}'.format(n_tokens))
+    print('list filter:  {:.3f}s ({:.0f} tokens/s)'.format(list_time, n_tokens / list_time))
+    print('TokenFilter:  {:.3f}s ({:.0f} tokens/s)'.format(filter_time, n_tokens / filter_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -3,7 +3,13 @@ import abc
 import numpy as np
 
 from itemizer.element import Itemset, TextElement
-from itemizer.alphabet import Alphabet
+from itemizer.alphabet import Alphabet, LabelAlphabet
+from itemizer.mining import FPGrowth
+from itemizer.index import BitmapIndex
+from itemizer.operations.cooccurrence import Cooccurrence
+from itemizer import export
+from itemizer.loader import BatchLoader
+from itemizer.hashing import HashingEncoder, N_FEATURES
 
 
 class Dataset(abc.ABC):
@@ -75,6 +81,10 @@ class ItemsetDataset(Dataset):
             for item in itemset:
                 self.alphabet[item] += 1
 
+    def compute_label_alphabet(self):
+        ''' Returns the item counts per label of the dataset. '''
+        return LabelAlphabet().update(self)
+
     def translate(self):
         translated_dataset = Dataset(separator=self.separator)
         translated_dataset.itemsets = []
@@ -118,16 +128,18 @@ class ItemsetDataset(Dataset):
                 if itemset.label is not None:
                     fout.write(bytes([itemset.label]))
 
+    def get_alphabet(self, alphabet=None, action='encode the dataset'):
+        ''' Returns alphabet if given, else the alphabet of the dataset. '''
+        if alphabet:
+            return alphabet
+        if not self.alphabet:
+            raise ValueError('Attempting to {} without an alphabet.'.format(action))
+        return self.alphabet
+
     def get_nparray(self, alphabet=None):
         print('HERe')
         print(len(self))
-        if alphabet:
-            ab = alphabet
-        else:
-            if not self.alphabet:
-                raise ValueError(
-                    'Attempting to get np array without an alphabet.')
-            ab = self.alphabet
+        ab = self.get_alphabet(alphabet, 'get np array')
 
         arr = np.zeros(shape=(len(self), len(ab)), dtype=np.uint8)
 
@@ -139,6 +151,61 @@ class ItemsetDataset(Dataset):
                         arr[i, ab.translate_item(item)] += 1
         return arr
 
+    def frequent_itemsets(self, min_support, alphabet=None, max_length=None):
+        ''' Mines the frequent itemsets of the dataset using FP-Growth. '''
+        return FPGrowth(min_support, max_length=max_length).fit(self, alphabet)
+
+    def build_index(self, alphabet=None):
+        ''' Builds a vertical bitmap index of the rows containing every item. '''
+        return BitmapIndex(self.get_alphabet(alphabet, 'build an index'), self)
+
+    def cooccurrence(self, alphabet=None, window=None, top_k=None):
+        ''' Accumulates the item co-occurrence counts of the dataset. '''
+        ab = self.get_alphabet(alphabet, 'count co-occurrences')
+
+        counter = Cooccurrence(ab, window=window, top_k=top_k)
+        for itemset in self._elements:
+            counter.itemset(itemset)
+        counter.end()
+        return counter
+
+    def _translator(self, alphabet=None):
+        ab = self.get_alphabet(alphabet, 'export')
+
+        if not ab.translator:
+            raise ValueError('Alphabet is not translated.')
+        return ab.translator
+
+    def to_arrays(self, alphabet=None):
+        ''' Returns the translated dataset as (offsets, values, labels) NumPy arrays.
+
+        The items of row i are values[offsets[i]:offsets[i+1]], missing labels are -1.
+        '''
+        return export.encode(self._elements, self._translator(alphabet))
+
+    def iter_arrays(self, chunk_size, alphabet=None):
+        ''' Yields (offsets, values, labels) arrays of chunk_size rows at a time. '''
+        translator = self._translator(alphabet)
+        for start in range(0, len(self), chunk_size):
+            yield export.encode(self._elements[start:start + chunk_size], translator)
+
+    def to_npy(self, prefix, alphabet=None, chunk_size=100000):
+        ''' Writes the translated dataset into three .npy files, see export.load_npy. '''
+        export.to_npy(self._elements, self._translator(alphabet), prefix, chunk_size)
+
+    def to_arrow(self, alphabet=None):
+        ''' Returns the translated dataset as a pyarrow RecordBatch. '''
+        return export.to_arrow(*self.to_arrays(alphabet))
+
+    def batches(self, batch_size, alphabet=None, **kwargs):
+        ''' Returns a BatchLoader over the dataset, see loader.BatchLoader. '''
+        return BatchLoader(self, alphabet, batch_size, **kwargs)
+
+    def hash_features(self, n_features=N_FEATURES, seed=0, alternate_sign=False, sparse=True):
+        ''' Encodes the dataset with the hashing trick, see hashing.HashingEncoder. '''
+        encoder = HashingEncoder(n_features=n_features, seed=seed, alternate_sign=alternate_sign)
+        return encoder.transform(self._elements, sparse=sparse)
+
 
 class TextDataset(Dataset):
     ''' Dataset where every element is simply a line of text. '''
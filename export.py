@@ -0,0 +1,74 @@
+import itertools
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+# label stored for elements without a label
+NO_LABEL = -1
+
+
+def encode(itemsets, translator):
+    ''' Encodes itemsets into (offsets, values, labels) arrays.
+
+    The items of row i are values[offsets[i]:offsets[i+1]]. Items missing from
+    the translator are dropped.
+    '''
+    rows = [[translator[item] for item in itemset.items if item in translator]
+            for itemset in itemsets]
+
+    offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum(np.fromiter(map(len, rows), dtype=np.int64, count=len(rows)), out=offsets[1:])
+    values = np.fromiter(itertools.chain.from_iterable(rows), dtype=np.int32,
+                         count=int(offsets[-1]))
+    labels = np.fromiter((NO_LABEL if itemset.label is None else itemset.label
+                          for itemset in itemsets), dtype=np.int64, count=len(rows))
+
+    return offsets, values, labels
+
+
+def to_npy(itemsets, translator, prefix, chunk_size=100000):
+    ''' Writes the encoded itemsets into prefix.offsets.npy, prefix.values.npy and prefix.labels.npy
+
+    Rows are encoded chunk by chunk directly into memory mapped files.
+    '''
+    n_values = sum(1 for itemset in itemsets for item in itemset.items if item in translator)
+
+    offsets = np.lib.format.open_memmap(prefix + '.offsets.npy', mode='w+',
+                                        dtype=np.int64, shape=(len(itemsets) + 1,))
+    values = np.lib.format.open_memmap(prefix + '.values.npy', mode='w+',
+                                       dtype=np.int32, shape=(n_values,))
+    labels = np.lib.format.open_memmap(prefix + '.labels.npy', mode='w+',
+                                       dtype=np.int64, shape=(len(itemsets),))
+
+    offsets[0] = 0
+    for start in range(0, len(itemsets), chunk_size):
+        chunk_offsets, chunk_values, chunk_labels = encode(
+            itemsets[start:start + chunk_size], translator)
+        first = offsets[start]
+        offsets[start + 1:start + len(chunk_labels) + 1] = chunk_offsets[1:] + first
+        values[first:first + len(chunk_values)] = chunk_values
+        labels[start:start + len(chunk_labels)] = chunk_labels
+
+    for arr in (offsets, values, labels):
+        arr.flush()
+
+
+def load_npy(prefix, mmap_mode='r'):
+    ''' Loads (offsets, values, labels) written by to_npy, memory mapped by default '''
+    return tuple(np.load(prefix + suffix, mmap_mode=mmap_mode)
+                 for suffix in ('.offsets.npy', '.values.npy', '.labels.npy'))
+
+
+def to_arrow(offsets, values, labels):
+    ''' Wraps the encoded arrays into a pyarrow RecordBatch with items and label columns '''
+    if pa is None:
+        raise ImportError('pyarrow is required for Arrow export.')
+
+    # 64 bit offsets so that the arrays are wrapped without a copy
+    items = pa.LargeListArray.from_arrays(pa.array(offsets), pa.array(values))
+    return pa.RecordBatch.from_arrays(
+        [items, pa.array(labels, mask=(labels == NO_LABEL))], ['items', 'label'])
@@ -0,0 +1,84 @@
+import hashlib
+import itertools
+
+import numpy as np
+
+# default number of features of the sparse hashing encoders
+N_FEATURES = 2**20
+
+
+class HashingEncoder():
+    ''' Encodes itemsets into a fixed number of features by hashing their items.
+
+    Items are hashed with a 32 bit BLAKE2b keyed by the seed, so the encoding is
+    deterministic, needs no Alphabet and different seeds give independent
+    collisions. The bucket is the hash modulo n_features and, with
+    alternate_sign, the highest bit of the hash gives the sign of the count.
+    '''
+
+    def __init__(self, n_features=N_FEATURES, seed=0, alternate_sign=False, chunk_size=100000):
+        self.n_features = n_features
+        self.seed = seed
+        self.alternate_sign = alternate_sign
+        self.chunk_size = chunk_size
+        self._key = seed.to_bytes(8, 'little', signed=True)
+
+    def _hash(self, item):
+        return int.from_bytes(hashlib.blake2b(str(item).encode('utf-8'), digest_size=4,
+                                              key=self._key).digest(), 'little')
+
+    def bucket(self, item):
+        ''' Returns the (feature, sign) of a single item '''
+        h = self._hash(item)
+        if self.alternate_sign and h >> 31:
+            return h % self.n_features, -1
+        return h % self.n_features, 1
+
+    def _hashes(self, items):
+        return np.fromiter(map(self._hash, items), dtype=np.uint32)
+
+    def transform_chunk(self, itemsets):
+        ''' Returns the (data, indices, indptr) CSR arrays of a list of itemsets '''
+        lengths = np.fromiter((len(itemset.items) for itemset in itemsets), dtype=np.int64,
+                              count=len(itemsets))
+        hashes = self._hashes(itertools.chain.from_iterable(itemset.items for itemset in itemsets))
+        rows = np.repeat(np.arange(len(itemsets)), lengths)
+
+        signs = np.ones(len(hashes), dtype=np.int64)
+        if self.alternate_sign:
+            signs[hashes >> 31 == 1] = -1
+
+        keys, inverse = np.unique(rows * self.n_features + (hashes % self.n_features),
+                                  return_inverse=True)
+        data = np.bincount(inverse.ravel(), weights=signs, minlength=len(keys)).astype(np.int32)
+
+        # buckets whose signed counts cancel out are dropped
+        nonzero = data != 0
+        keys = keys[nonzero]
+        indptr = np.searchsorted(keys, np.arange(len(itemsets) + 1) * self.n_features)
+        return data[nonzero], (keys % self.n_features).astype(np.int32), indptr
+
+    def transform(self, itemsets, sparse=True):
+        ''' Encodes the itemsets chunk by chunk.
+
+        Returns (data, indices, indptr) CSR arrays (the arguments of
+        scipy.sparse.csr_matrix) or, if sparse is False, a dense int32 array.
+        '''
+        chunks = [self.transform_chunk(itemsets[start:start + self.chunk_size])
+                  for start in range(0, len(itemsets), self.chunk_size)]
+
+        data = np.concatenate([np.zeros(0, dtype=np.int32)] + [c[0] for c in chunks])
+        indices = np.concatenate([np.zeros(0, dtype=np.int32)] + [c[1] for c in chunks])
+        indptr = np.zeros(len(itemsets) + 1, dtype=np.int64)
+        start = 0
+        for chunk in chunks:
+            rows = len(chunk[2]) - 1
+            indptr[start + 1:start + rows + 1] = chunk[2][1:] + indptr[start]
+            start += rows
+
+        if sparse:
+            return data, indices, indptr
+
+        arr = np.zeros(shape=(len(itemsets), self.n_features), dtype=np.int32)
+        arr[np.repeat(np.arange(len(itemsets)), np.diff(indptr)), indices] = data
+        return arr
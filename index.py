@@ -0,0 +1,203 @@
+import numpy as np
+
+# number of set bits of every byte value
+_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+_EMPTY = np.zeros(0, dtype=np.uint32)
+
+
+def _popcount(arr, axis=None):
+    return _POPCOUNT[arr].sum(axis=axis, dtype=np.int64)
+
+
+class BitmapIndex():
+    ''' Vertical index of an ItemsetDataset: the set of rows containing each item.
+
+    Every translated item id owns a container holding its rows, either as a
+    sorted uint32 array (sparse items) or as a packed bitmap (dense items),
+    similar to roaring bitmaps. The container kind is given by its dtype.
+    '''
+
+    def __init__(self, alphabet, dataset=None, dense_ratio=1/32.):
+        if not alphabet.translator:
+            raise ValueError('Alphabet is not translated.')
+
+        self.alphabet = alphabet
+        self.n_rows = 0
+        # items present in more than dense_ratio of the rows are stored as bitmaps
+        self.dense_ratio = dense_ratio
+
+        self._containers = [_EMPTY] * (max(alphabet.translator.values()) + 1)
+        self._pending_items = []
+        self._pending_rows = []
+
+        if dataset is not None:
+            self.update(dataset)
+
+    def __len__(self):
+        return self.n_rows
+
+    def append(self, itemset):
+        ''' Adds an itemset as the next row of the index '''
+        translator = self.alphabet.translator
+        for idx in {translator[item] for item in itemset.items if item in translator}:
+            self._pending_items.append(idx)
+            self._pending_rows.append(self.n_rows)
+        self.n_rows += 1
+
+    def update(self, dataset):
+        for itemset in dataset._elements:
+            self.append(itemset)
+        return self
+
+    def _flush(self):
+        if not self._pending_items:
+            return
+
+        items = np.array(self._pending_items, dtype=np.int64)
+        rows = np.array(self._pending_rows, dtype=np.uint32)
+        self._pending_items = []
+        self._pending_rows = []
+
+        # rows are already increasing within every item after a stable sort
+        order = np.argsort(items, kind='mergesort')
+        items = items[order]
+        rows = rows[order]
+        ids, starts = np.unique(items, return_index=True)
+
+        for idx, new_rows in zip(ids, np.split(rows, starts[1:])):
+            container = self._containers[idx]
+            if container.dtype == np.uint8:
+                container = self._to_bitmap(container)
+                np.bitwise_or.at(container, new_rows >> 3,
+                                 (0x80 >> (new_rows & 7)).astype(np.uint8))
+            else:
+                container = np.concatenate((container, new_rows))
+                if len(container) > self.n_rows * self.dense_ratio:
+                    container = self._to_bitmap(container)
+            self._containers[idx] = container
+
+    def _to_bitmap(self, container):
+        n_bytes = (self.n_rows + 7) // 8
+        if container.dtype == np.uint8:
+            if len(container) >= n_bytes:
+                return container
+            bitmap = np.zeros(n_bytes, dtype=np.uint8)
+            bitmap[:len(container)] = container
+            return bitmap
+
+        bitmap = np.zeros(n_bytes, dtype=np.uint8)
+        np.bitwise_or.at(bitmap, container >> 3,
+                         (0x80 >> (container & 7)).astype(np.uint8))
+        return bitmap
+
+    def _to_rows(self, container):
+        if container.dtype == np.uint8:
+            return np.flatnonzero(np.unpackbits(container)).astype(np.uint32)
+        return container
+
+    def _cardinality(self, container):
+        if container.dtype == np.uint8:
+            return _popcount(container)
+        return len(container)
+
+    def _get_containers(self, items):
+        self._flush()
+        translator = self.alphabet.translator
+        if any(item not in translator for item in items):
+            return None
+        return [self._containers[translator[item]] for item in set(items)]
+
+    def rows_with(self, items):
+        ''' Returns the sorted indices of the rows containing all the items '''
+        containers = self._get_containers(items)
+        if containers is None:
+            return _EMPTY.copy()
+        if not containers:
+            return np.arange(self.n_rows, dtype=np.uint32)
+
+        containers.sort(key=self._cardinality)
+        arrays = [c for c in containers if c.dtype == np.uint32]
+        bitmaps = [c for c in containers if c.dtype == np.uint8]
+
+        if not arrays:
+            bitmap = self._to_bitmap(bitmaps[0]).copy()
+            for other in bitmaps[1:]:
+                bitmap &= self._to_bitmap(other)
+            return self._to_rows(bitmap)
+
+        rows = arrays[0]
+        for other in arrays[1:]:
+            rows = np.intersect1d(rows, other, assume_unique=True)
+        for other in bitmaps:
+            other = self._to_bitmap(other)
+            rows = rows[(other[rows >> 3] & (0x80 >> (rows & 7))) != 0]
+        return rows
+
+    def support(self, items):
+        ''' Returns the number of rows containing all the items '''
+        containers = self._get_containers(items)
+        if containers is None:
+            return 0
+        if not containers:
+            return self.n_rows
+
+        if all(c.dtype == np.uint8 for c in containers):
+            bitmap = self._to_bitmap(containers[0]).copy()
+            for other in containers[1:]:
+                bitmap &= self._to_bitmap(other)
+            return int(_popcount(bitmap))
+
+        return len(self.rows_with(items))
+
+    def cooccurrence(self, items):
+        ''' Returns a symmetric matrix with the number of rows containing each pair of items.
+
+        The diagonal holds the support of every item.
+        '''
+        self._flush()
+        translator = self.alphabet.translator
+        n_bytes = (self.n_rows + 7) // 8
+
+        bitmaps = np.zeros((len(items), n_bytes), dtype=np.uint8)
+        for i, item in enumerate(items):
+            if item in translator:
+                bitmaps[i] = self._to_bitmap(self._containers[translator[item]])[:n_bytes]
+
+        counts = np.zeros((len(items), len(items)), dtype=np.int64)
+        for i in range(len(items)):
+            counts[i, i:] = _popcount(bitmaps[i] & bitmaps[i:], axis=1)
+            counts[i:, i] = counts[i, i:]
+        return counts
+
+    def to_file(self, filename):
+        self._flush()
+
+        kinds = np.array([c.dtype == np.uint8 for c in self._containers], dtype=np.uint8)
+        blobs = [c.view(np.uint8) for c in self._containers]
+        offsets = np.zeros(len(blobs) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in blobs], out=offsets[1:])
+
+        with open(filename, 'wb') as fout:
+            np.savez(fout, n_rows=np.array([self.n_rows]), dense_ratio=np.array([self.dense_ratio]),
+                     kinds=kinds, offsets=offsets, data=np.concatenate(blobs))
+
+    def from_file(self, filename):
+        with np.load(filename) as npz:
+            kinds = npz['kinds']
+            offsets = npz['offsets']
+            data = npz['data']
+            self.n_rows = int(npz['n_rows'][0])
+            self.dense_ratio = float(npz['dense_ratio'][0])
+
+        assert (len(kinds) <= len(self._containers)
+                ), "Index has more items than the alphabet."
+
+        for idx, kind in enumerate(kinds):
+            blob = data[offsets[idx]:offsets[idx + 1]].copy()
+            self._containers[idx] = blob if kind else blob.view(np.uint32)
+
+        self._pending_items = []
+        self._pending_rows = []
+
+        return self
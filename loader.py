@@ -0,0 +1,135 @@
+import queue
+import threading
+
+import numpy as np
+
+
+class BatchLoader():
+    ''' Iterates over an ItemsetDataset in (counts, labels) mini-batches.
+
+    The dataset is encoded once with ItemsetDataset.to_arrays. Batches are built
+    by a background thread that keeps up to prefetch batches ready. Dense
+    batches are written into preallocated buffers that are reused, so a batch
+    is only valid until the next one is requested: copy it to keep it.
+    Sparse batches are (data, indices, indptr) tuples, the arguments of
+    scipy.sparse.csr_matrix. Counts saturate at the maximum value of dtype.
+    '''
+
+    def __init__(self, dataset, alphabet=None, batch_size=256, shuffle=False, seed=None,
+                 prefetch=2, sparse=False, dtype=np.uint8, drop_last=False):
+        self.offsets, self.values, self.labels = dataset.to_arrays(alphabet)
+        self.n_features = max(dataset.get_alphabet(alphabet).translator.values()) + 1
+
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.seed = seed
+        self.prefetch = prefetch
+        self.sparse = sparse
+        self.dtype = np.dtype(dtype)
+        self.drop_last = drop_last
+
+        self._max_count = np.iinfo(self.dtype).max if self.dtype.kind in 'ui' else None
+        self._epoch = 0
+
+    def __len__(self):
+        n_rows = len(self.labels)
+        if self.drop_last:
+            return n_rows // self.batch_size
+        return (n_rows + self.batch_size - 1) // self.batch_size
+
+    def _order(self):
+        if not self.shuffle:
+            return np.arange(len(self.labels))
+
+        seed = None if self.seed is None else self.seed + self._epoch
+        return np.random.RandomState(seed).permutation(len(self.labels))
+
+    def _gather(self, rows):
+        ''' Returns the row number and item id of every item of the rows '''
+        starts = self.offsets[rows]
+        lengths = self.offsets[rows + 1] - starts
+        row_ids = np.repeat(np.arange(len(rows)), lengths)
+        first = np.repeat(np.cumsum(lengths) - lengths, lengths)
+        positions = np.arange(len(row_ids)) - first + np.repeat(starts, lengths)
+        return row_ids, self.values[positions]
+
+    def _counts(self, rows):
+        ''' Returns the sorted unique (row, item) keys and their counts '''
+        row_ids, items = self._gather(rows)
+        keys, counts = np.unique(row_ids * self.n_features + items, return_counts=True)
+        if self._max_count is not None:
+            counts = np.minimum(counts, self._max_count)
+        return keys, counts.astype(self.dtype)
+
+    def _build(self, rows, buffer):
+        keys, counts = self._counts(rows)
+
+        if self.sparse:
+            indptr = np.searchsorted(keys, np.arange(len(rows) + 1) * self.n_features)
+            return (counts, (keys % self.n_features).astype(np.int32), indptr), self.labels[rows]
+
+        out = buffer[:len(rows)]
+        out.fill(0)
+        out.reshape(-1)[keys] = counts
+        return out, self.labels[rows]
+
+    @staticmethod
+    def _put(ready, item, stop):
+        while not stop.is_set():
+            try:
+                ready.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def _produce(self, order, ready, free, stop):
+        try:
+            for batch in range(len(self)):
+                rows = order[batch * self.batch_size:(batch + 1) * self.batch_size]
+                buffer = None
+                while not self.sparse and buffer is None:
+                    if stop.is_set():
+                        return
+                    try:
+                        buffer = free.get(timeout=0.1)
+                    except queue.Empty:
+                        pass
+
+                self._put(ready, (self._build(rows, buffer), buffer), stop)
+            self._put(ready, None, stop)
+        except Exception as e:
+            self._put(ready, e, stop)
+
+    def __iter__(self):
+        order = self._order()
+        self._epoch += 1
+
+        ready = queue.Queue(maxsize=max(1, self.prefetch))
+        # dense output buffers of this iteration, the one yielded last plus the ones
+        # being prefetched, so that concurrent iterators never share them
+        free = queue.Queue()
+        if not self.sparse:
+            for _ in range(self.prefetch + 1):
+                free.put(np.zeros((self.batch_size, self.n_features), dtype=self.dtype))
+        stop = threading.Event()
+
+        producer = threading.Thread(target=self._produce, args=(order, ready, free, stop), daemon=True)
+        producer.start()
+
+        try:
+            previous = None
+            while True:
+                item = ready.get()
+                if item is None:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+
+                # the consumer is done with the previous dense batch
+                if previous is not None:
+                    free.put(previous)
+                batch, previous = item
+                yield batch
+        finally:
+            stop.set()
+            producer.join()
@@ -0,0 +1,139 @@
+import itertools
+import collections
+
+import numpy as np
+
+
+class FPGrowth():
+    ''' Mines frequent itemsets from an ItemsetDataset using FP-Growth.
+
+    Items are ordered in the FP-tree by their translated id, so a translated
+    Alphabet (most frequent item first) gives the usual frequency ordering.
+    '''
+
+    def __init__(self, min_support, max_length=None):
+        # absolute row count (int) or fraction of the rows (float < 1)
+        self.min_support = min_support
+        self.max_length = max_length
+
+        self._min_count = None
+
+    def _encode(self, dataset, alphabet):
+        ''' Returns a Counter of (sorted id tuple -> number of rows) '''
+        transactions = collections.Counter()
+        translator = alphabet.translator
+        for itemset in dataset._elements:
+            ids = {translator[item] for item in itemset.items if item in translator}
+            if ids:
+                transactions[tuple(sorted(ids))] += 1
+        return transactions
+
+    def _count(self, transactions, n_items):
+        ''' Vectorized support count of every item in a weighted transaction list '''
+        lengths = np.fromiter((len(t) for t, _ in transactions), dtype=np.int64,
+                              count=len(transactions))
+        weights = np.fromiter((w for _, w in transactions), dtype=np.int64,
+                              count=len(transactions))
+        flat = np.fromiter(itertools.chain.from_iterable(t for t, _ in transactions),
+                           dtype=np.int64, count=int(lengths.sum()))
+        return np.bincount(flat, weights=np.repeat(weights, lengths),
+                           minlength=n_items).astype(np.int64)
+
+    def _build_tree(self, transactions, frequent):
+        ''' Builds an FP-tree as flat node arrays. Node 0 is the root. '''
+        parents = [-1]
+        items = [-1]
+        counts = [0]
+        children = [dict()]
+        header = collections.defaultdict(list)
+
+        for transaction, weight in transactions:
+            node = 0
+            for item in transaction:
+                if not frequent[item]:
+                    continue
+                child = children[node].get(item)
+                if child is None:
+                    child = len(items)
+                    children[node][item] = child
+                    parents.append(node)
+                    items.append(item)
+                    counts.append(0)
+                    children.append(dict())
+                    header[item].append(child)
+                counts[child] += weight
+                node = child
+
+        return parents, items, counts, children, header
+
+    def _mine(self, transactions, suffix, n_items, out):
+        support = self._count(transactions, n_items)
+        frequent = support >= self._min_count
+        if not frequent.any():
+            return
+
+        parents, items, counts, children, header = self._build_tree(
+            transactions, frequent)
+
+        # a single path tree: every combination of its nodes is frequent
+        if all(len(c) <= 1 for c in children):
+            path = list(zip(items[1:], counts[1:]))
+            max_size = len(path)
+            if self.max_length is not None:
+                max_size = min(max_size, self.max_length - len(suffix))
+            for size in range(1, max_size + 1):
+                for combination in itertools.combinations(path, size):
+                    out.append((tuple(i for i, _ in combination) + suffix,
+                                combination[-1][1]))
+            return
+
+        # least frequent items first
+        for item in sorted(header, reverse=True):
+            new_suffix = (item,) + suffix
+            out.append((new_suffix, int(support[item])))
+
+            if self.max_length is not None and len(new_suffix) >= self.max_length:
+                continue
+
+            # conditional pattern base
+            conditional = []
+            for node in header[item]:
+                path = []
+                parent = parents[node]
+                while parent > 0:
+                    path.append(items[parent])
+                    parent = parents[parent]
+                if path:
+                    path.reverse()
+                    conditional.append((tuple(path), counts[node]))
+
+            if conditional:
+                self._mine(conditional, new_suffix, n_items, out)
+
+    def fit(self, dataset, alphabet=None, translate=True):
+        ''' Returns a list of (itemset, support) tuples.
+
+        If translate is False the itemsets contain translated ids instead of items.
+        '''
+        ab = dataset.get_alphabet(alphabet, 'mine itemsets')
+
+        if not ab.translator:
+            raise ValueError('Alphabet is not translated.')
+
+        if isinstance(self.min_support, float) and self.min_support < 1:
+            self._min_count = max(1, int(np.ceil(self.min_support * len(dataset))))
+        else:
+            self._min_count = int(self.min_support)
+
+        transactions = list(self._encode(dataset, ab).items())
+        out = []
+        if transactions:
+            n_items = max(ab.translator.values()) + 1
+            self._mine(transactions, (), n_items, out)
+
+        if translate:
+            inverse = {idx: key for key, idx in ab.translator.items()}
+            out = [(tuple(inverse[i] for i in itemset), support)
+                   for itemset, support in out]
+
+        return out
@@ -0,0 +1,151 @@
+import abc
+import re
+import itertools
+
+import requests
+
+
+class Annotator(abc.ABC):
+    ''' Splits a text into sentences and tokens, returning CoreNLP style json:
+    {'sentences': [{'tokens': [{'originalText', 'word', 'pos', 'characterOffsetEnd', ...}]}]} '''
+
+    # annotator properties that the backend is able to produce
+    supports_pos = False
+    supports_lemma = False
+
+    @abc.abstractmethod
+    def annotate(self, string, lemmatize=False):
+        pass
+
+    def tokens(self, string, lemmatize=False):
+        ''' Returns the sentences of string as lists of (originalText, word, pos, lemma) tuples '''
+        return [[(token['originalText'], token['word'], token['pos'], token.get('lemma'))
+                 for token in sentence['tokens']]
+                for sentence in self.annotate(string, lemmatize)['sentences']]
+
+
+class CoreNLPAnnotator(Annotator):
+    ''' Annotates texts by calling a CoreNLP server. '''
+
+    supports_pos = True
+    supports_lemma = True
+
+    def __init__(self, uri='http://localhost:9000/'):
+        self.uri = uri
+        # reuse the connection between requests
+        self._session = requests.Session()
+
+    def annotate(self, string, lemmatize=False):
+        annotators = "tokenize,ssplit,pos"
+        if lemmatize:
+            annotators = "lemma," + annotators
+
+        response = self._session.post('{core_nlp_api_uri}?properties={{"annotators":"{annotators}","outputFormat":"json"}}'.format(
+            core_nlp_api_uri=self.uri, annotators=annotators), data=string.encode('utf-8'))
+
+        # if there is an error
+        response.raise_for_status()
+        return response.json()
+
+
+class RegexAnnotator(Annotator):
+    ''' In-process rule based tokenizer and sentence splitter. Produces no POS tags or lemmas.
+
+    Tokens follow the CoreNLP conventions used by ProcessorTokenize: contractions
+    are split (do n't, cat 's), quotes become `` and '' and brackets -LRB- / -RRB-.
+    '''
+
+    _TOKEN_REGEX = re.compile(r"""
+        \w+(?=n't\b)                 # stem of a negative contraction
+        | n't\b
+        | '(?:s|re|ve|ll|d|m)\b      # clitics
+        | (?:[a-z]\.){2,}             # abbreviations (U.S.)
+        | \w+(?:[-.&]\w+)*           # words, numbers, hyphenated words
+        | \.{2,} | -{2,} | [—–]+     # ellipsis and dashes
+        | \S                         # any other symbol
+        """, re.VERBOSE | re.IGNORECASE)
+
+    _SENTENCE_END = frozenset(['.', '!', '?', '...', '....'])
+    # tokens that still belong to the sentence after its final punctuation
+    _SENTENCE_CLOSE = frozenset(['"', ')', ']', '}', '\''])
+
+    _WORD_MAP = {
+        '(': '-LRB-', ')': '-RRB-',
+        '[': '-LSB-', ']': '-RSB-',
+        '{': '-LCB-', '}': '-RCB-'
+    }
+
+    # strings without these characters need no per token mapping of the words
+    _MAPPED_REGEX = re.compile(r'["()\[\]{}]')
+
+    def _words(self, tokens):
+        ''' Returns the CoreNLP words of the tokens: quotes and brackets are replaced '''
+        words = []
+        quotes_open = False
+        for original_text in tokens:
+            if original_text == '"':
+                words.append("''" if quotes_open else '``')
+                quotes_open = not quotes_open
+            else:
+                words.append(self._WORD_MAP.get(original_text, original_text))
+        return words
+
+    def _split(self, string):
+        ''' Returns the tokens of string.
+
+        Tokens never span whitespace, so the string is split first and only the
+        chunks that are not plain words go through the token regex.
+        '''
+        tokens = []
+        for chunk in string.split():
+            if chunk.isalnum():
+                tokens.append(chunk)
+            else:
+                tokens.extend(self._TOKEN_REGEX.findall(chunk))
+        return tokens
+
+    def _sentence_starts(self, tokens):
+        ''' Returns the index of the first token of every sentence but the first '''
+        starts = []
+        end = self._SENTENCE_END
+        close = self._SENTENCE_CLOSE
+        for i in [i for i, original_text in enumerate(tokens) if original_text in end]:
+            # the closing quotes and brackets after the punctuation stay in the sentence
+            i += 1
+            while i < len(tokens) and tokens[i] in close:
+                i += 1
+            if i < len(tokens):
+                starts.append(i)
+        return starts
+
+    def tokens(self, string, lemmatize=False):
+        if lemmatize:
+            raise ValueError('RegexAnnotator does not support lemmatization.')
+
+        tokens = self._split(string)
+        words = tokens
+        if self._MAPPED_REGEX.search(string):
+            words = self._words(tokens)
+
+        bounds = [0] + self._sentence_starts(tokens) + [len(tokens)]
+        return [list(zip(tokens[start:stop], words[start:stop],
+                         itertools.repeat(''), itertools.repeat(None)))
+                for start, stop in zip(bounds, bounds[1:]) if stop > start]
+
+    def annotate(self, string, lemmatize=False):
+        sentences = []
+        offset = 0
+        for sentence in self.tokens(string, lemmatize):
+            tokens = []
+            for original_text, word, pos, _ in sentence:
+                # only whitespace separates the tokens
+                offset = string.find(original_text, offset) + len(original_text)
+                tokens.append({
+                    'originalText': original_text,
+                    'word': word,
+                    'pos': pos,
+                    'characterOffsetEnd': offset
+                })
+            sentences.append({'tokens': tokens})
+
+        return {'sentences': sentences}
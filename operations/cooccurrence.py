@@ -0,0 +1,166 @@
+import numpy as np
+
+# rows up to this length take their pairs from a cached triangle of indices
+_SMALL_ROW = 64
+
+class Cooccurrence():
+	""" Accumulates a sparse symmetric item co-occurrence matrix over translated ids. """
+
+	def __init__(self, alphabet, window=None, top_k=None, batch_size=1000000, translated=False):
+		""" Initializes attributes.
+
+		window: only count pairs at most window positions apart (None: whole itemset).
+		top_k: after every compaction keep only the top_k partners of each item.
+		batch_size: number of buffered items or pairs before compacting, also bounds the
+			pairs held in memory while compacting.
+		translated: the incoming items are already translated ids (eg. after Filter(translate=True)).
+		"""
+		assert (alphabet.translator), "Alphabet not translated."
+
+		self.alphabet = alphabet
+		self.window = window
+		self.top_k = top_k
+		self.batch_size = batch_size
+		self.translated = translated
+		self.n_items = max(alphabet.translator.values()) + 1
+
+		# compacted upper triangle, keys are row * n_items + col
+		self.keys = np.zeros(0, dtype=np.int64)
+		self.counts = np.zeros(0, dtype=np.int64)
+
+		# COO batch: flat ids and the length of every row
+		self._ids = []
+		self._lengths = []
+		self._n_pairs = 0
+
+		self._triangles = dict()
+
+	def _count_pairs(self, length):
+		if self.window is None or self.window >= length - 1:
+			return length * (length - 1) // 2
+		return self.window * length - self.window * (self.window + 1) // 2
+
+	def _triangle(self, length):
+		""" Returns the (left, right) positions of the pairs of a row, cached per length. """
+		if length not in self._triangles:
+			left, right = np.triu_indices(length, 1)
+			if self.window is not None:
+				near = right - left <= self.window
+				left, right = left[near], right[near]
+			self._triangles[length] = (left, right)
+		return self._triangles[length]
+
+	def itemset(self, itemset):
+		if self.translated:
+			ids = itemset.items
+		else:
+			translator = self.alphabet.translator
+			ids = [translator[item] for item in itemset.items if item in translator]
+
+		if len(ids) > 1:
+			self._ids.extend(ids)
+			self._lengths.append(len(ids))
+			self._n_pairs += self._count_pairs(len(ids))
+			if len(self._ids) >= self.batch_size or self._n_pairs >= self.batch_size:
+				self.compact()
+
+	def _fold(self, keys):
+		""" Adds a list of pair key arrays to the matrix. """
+		if not keys:
+			return
+		keys = np.concatenate([self.keys] + keys)
+		weights = np.ones(len(keys), dtype=np.int64)
+		weights[:len(self.counts)] = self.counts
+
+		self.keys, inverse = np.unique(keys, return_inverse=True)
+		self.counts = np.bincount(inverse.ravel(), weights=weights,
+			minlength=len(self.keys)).astype(np.int64)
+
+	def compact(self):
+		""" Adds the buffered pairs to the matrix and prunes it.
+
+		Rows are grouped by length so that only their actual pairs are generated,
+		at most batch_size pairs are held before adding them to the matrix.
+		"""
+		if not self._ids:
+			return
+
+		ids = np.array(self._ids, dtype=np.int64)
+		lengths = np.array(self._lengths, dtype=np.int64)
+		self._ids = []
+		self._lengths = []
+		self._n_pairs = 0
+
+		starts = np.cumsum(lengths) - lengths
+
+		pending = []
+		n_pending = 0
+		for length in np.unique(lengths):
+			group_starts = starts[lengths == length]
+			if length <= _SMALL_ROW:
+				first, second = self._triangle(length)
+				# rows of the group per chunk, so that a chunk has at most batch_size pairs
+				step = max(1, self.batch_size // max(1, len(first)))
+				chunks = ((ids[group_starts[i:i + step, None] + first], ids[group_starts[i:i + step, None] + second])
+					for i in range(0, len(group_starts), step))
+			else:
+				# long rows: one pair offset at a time, row by row
+				max_offset = length - 1
+				if self.window is not None:
+					max_offset = min(max_offset, self.window)
+				chunks = ((ids[start:start + length - offset], ids[start + offset:start + length])
+					for start in group_starts for offset in range(1, max_offset + 1))
+
+			for left, right in chunks:
+				left = left.ravel()
+				right = right.ravel()
+				distinct = left != right
+				left = left[distinct]
+				right = right[distinct]
+				pending.append(np.minimum(left, right) * self.n_items + np.maximum(left, right))
+				n_pending += len(left)
+				if n_pending >= self.batch_size:
+					self._fold(pending)
+					pending = []
+					n_pending = 0
+
+		self._fold(pending)
+
+		if self.top_k is not None:
+			self._prune()
+
+	def _prune(self):
+		""" Keeps the pairs that are among the top_k of either of their items. """
+		rows = self.keys // self.n_items
+		cols = self.keys % self.n_items
+
+		both_rows = np.concatenate((rows, cols))
+		both_counts = np.concatenate((self.counts, self.counts))
+		pair = np.concatenate((np.arange(len(self.keys)), np.arange(len(self.keys))))
+
+		order = np.lexsort((-both_counts, both_rows))
+		sorted_rows = both_rows[order]
+		first = np.searchsorted(sorted_rows, sorted_rows, side='left')
+		rank = np.arange(len(order)) - first
+
+		keep = np.unique(pair[order[rank < self.top_k]])
+		self.keys = self.keys[keep]
+		self.counts = self.counts[keep]
+
+	def end(self):
+		self.compact()
+		return
+
+	def to_coo(self):
+		""" Returns the full symmetric matrix as (rows, cols, counts) arrays. """
+		self.compact()
+		rows = self.keys // self.n_items
+		cols = self.keys % self.n_items
+		return (np.concatenate((rows, cols)), np.concatenate((cols, rows)),
+			np.concatenate((self.counts, self.counts)))
+
+	def to_dense(self):
+		rows, cols, counts = self.to_coo()
+		arr = np.zeros(shape=(self.n_items, self.n_items), dtype=np.int64)
+		arr[rows, cols] = counts
+		return arr
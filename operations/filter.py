@@ -32,6 +32,11 @@ class Filter():
 			for pipe in self.connected_pipes:
 				pipe.itemset(new_itemset)
 
+	def flush(self):
+		for pipe in self.connected_pipes:
+			if hasattr(pipe, 'flush'):
+				pipe.flush()
+
 	def end(self):
 		for pipe in self.connected_pipes:
 			pipe.end()
@@ -0,0 +1,41 @@
+from itemizer.hashing import HashingEncoder
+
+class HashingVectorizer():
+	""" Writes hashed item counts to file, without an alphabet.
+
+	Every row is written dense, one byte per feature, so n_features defaults to a
+	small 2**10 and not to hashing.N_FEATURES, the default of the sparse encoders.
+	"""
+
+	def __init__(self, filename, n_features=2**10, seed=0, alternate_sign=False):
+		""" Initializes attributes. """
+		self.filename = filename
+		self.encoder = HashingEncoder(n_features=n_features, seed=seed, alternate_sign=alternate_sign)
+
+	def __enter__(self):
+		self.out_file = open(self.filename,"wb")
+		return self
+
+	def __exit__(self, exc_type, exc_value, exc_traceback):
+		self.out_file.close()
+
+	def itemset(self, itemset):
+		counts = dict()
+		for item in itemset:
+			feature, sign = self.encoder.bucket(item)
+			counts[feature] = counts.get(feature, 0) + sign
+
+		# one byte per feature: uint8, or int8 with alternate_sign
+		row = bytearray(self.encoder.n_features)
+		for feature, count in counts.items():
+			if self.encoder.alternate_sign:
+				row[feature] = max(-128, min(count, 127)) & 0xFF
+			else:
+				row[feature] = min(count, 255)
+
+		self.out_file.write(row)
+		if itemset.label is not None:
+			self.out_file.write(bytes([itemset.label]))
+
+	def end(self):
+		return
@@ -1,16 +1,31 @@
 import abc
 import re
 import copy
+import hashlib
+import threading
+import collections
 
-import requests
 import itertools
+import numpy as np
 
 from itemizer.element import TextElement, Itemset
 from itemizer.dataset import TextDataset, ItemsetDataset
+from itemizer.operations.token_filter import TokenFilter
+from itemizer.operations.annotator import Annotator, CoreNLPAnnotator, RegexAnnotator
+
+def _empty_like(dataset):
+    ''' Returns an empty dataset of the same type, keeping the itemset separator '''
+    if isinstance(dataset, ItemsetDataset):
+        return ItemsetDataset(separator=dataset.separator)
+    return type(dataset)()
+
 
 class Processor(abc.ABC):
     ''' Processes an element and returns the resulting lines. '''
 
+    # the output only depends on the element, so it can be memoized by ProcessorCache
+    cacheable = True
+
     def __init__(self):
         super().__init__()
 
@@ -177,41 +192,36 @@ class ProcessorTokenize(Processor):
             'min_length': 0,
             'parentheses_action': 'delete',
             'pos_filter': None,
+            'pos_to_substitute': None,
             'stop_words': None,
             'split_on': [],
             'stop_words': False,
+            # 'corenlp', 'regex' (in-process, no POS tags or lemmas) or an Annotator
+            'annotator': 'corenlp',
             'core_nlp_api_uri': 'http://localhost:9000/'
         }
 
         # merge config options
         self._config.update(config)
 
-        # processing config
-        if self._config['pos_filter']:
-            if self._config['pos_filter'][0] == '^':
-                self._config['pos_filter_negative'] = True
-                self._config['pos_filter'] = self._config['pos_filter'][1:].split('|')
-            else:
-                self._config['pos_filter'] = self._config['pos_filter'].split('|')
+        if isinstance(self._config['annotator'], Annotator):
+            self._annotator = self._config['annotator']
+        elif self._config['annotator'] == 'corenlp':
+            self._annotator = CoreNLPAnnotator(self._config['core_nlp_api_uri'])
+        elif self._config['annotator'] == 'regex':
+            self._annotator = RegexAnnotator()
         else:
-            # default: allow all
-            self._config['pos_filter_negative'] = True
-            self._config['pos_filter'] = []
+            raise ValueError('Unknown value for config annotator.')
 
-        if self._config['pos_to_substitute']:
-            self._config['pos_to_substitute'] = self._config['pos_to_substitute'].split('|')
-        else:
-            self._config['pos_to_substitute'] = []
-
-        self._stop_words = []
-        self._stop_regexes = []
-        if self._config['stop_words']:
-            for stop_word in self._config['stop_words']:
-                m = re.match('^rgx:(.*)', stop_word)
-                if m:
-                    self._stop_regexes.append(m.group(1))
-                else:
-                    self._stop_words.append(stop_word)
+        if self._config['lemmatize'] and not self._annotator.supports_lemma:
+            raise ValueError('The annotator does not support lemmatization.')
+        if (self._config['pos_filter'] or self._config['pos_to_substitute']) and not self._annotator.supports_pos:
+            raise ValueError('The annotator does not support POS tagging.')
+
+        self._filter = TokenFilter(
+            stop_words=self._config['stop_words'],
+            pos_filter=self._config['pos_filter'],
+            pos_to_substitute=self._config['pos_to_substitute'])
 
         self._stats = {
             'in': {
@@ -229,14 +239,7 @@ class ProcessorTokenize(Processor):
         ProcessorTokenize.cnt += 1
 
     def _is_stop_word(self, word):
-        if word in self._stop_words:
-            return True
-
-        for regex in self._stop_regexes:
-            if re.match(regex, word):
-                return True
-
-        return False
+        return self._filter.is_stop_word(word)
 
     def log_elem(self, elem):
         return False
@@ -250,33 +253,26 @@ class ProcessorTokenize(Processor):
         itemset = Itemset()
         itemset.label = elem.label
 
-        # prepare request to CoreNLP
-        annotators = "tokenize,ssplit,pos"
-        if self._config['lemmatize']:
-            annotators = "lemma," + annotators
+        sentences = self._annotator.tokens(elem.string, self._config['lemmatize'])
 
-        response = requests.post('{core_nlp_api_uri}?properties={{"annotators":"{annotators}","outputFormat":"json"}}'.format(
-            core_nlp_api_uri=self._config['core_nlp_api_uri'], annotators=annotators), data=elem.string.encode('utf-8'))
-
-        # if there is an error
-        response.raise_for_status()
-        json = response.json()
+        # config and filter lookups hoisted out of the token loop
+        lemmatize = self._config['lemmatize']
+        parentheses_action = self._config['parentheses_action']
+        split_on = self._config['split_on']
+        sentence_split = self._config['sentence_split']
+        min_length = self._config['min_length']
+        keep = self._filter.keep
+        substitute = self._filter.substitute
 
         # PROCESSING STARTS
-        previous_char_offset = 0
         quotes_open = False
-        words = []
-        txt = ''
 
-        for i, sentence in enumerate(json['sentences']):
+        for i, sentence in enumerate(sentences):
             self._stats['in']['sentences'] += 1
+            self._stats['in']['tokens'] += len(sentence)
+            last = len(sentence) - 1
 
-            for j, token in enumerate(sentence['tokens']):
-                self._stats['in']['tokens'] += 1
-
-                original_text = token['originalText']
-                do_add = True
-
+            for j, (original_text, word, pos, lemma) in enumerate(sentence):
                 if original_text == '"':
                     if i+j > 0:
                         quotes_open = not quotes_open
@@ -285,33 +281,23 @@ class ProcessorTokenize(Processor):
 
                 else:
                     # possibly ignore words between quotes
-                    if quotes_open and self._config['parentheses_action'] == 'delete':
+                    if quotes_open and parentheses_action == 'delete':
                         continue
 
-                # filter by POS
-                if self._config['pos_filter_negative']:
-                    if token['pos'] in self._config['pos_filter']:
-                        do_add = False
-                else:
-                    if token['pos'] not in self._config['pos_filter']:
-                        do_add = False
-
                 # get lemma or lowercase word
-                word = None
-                if quotes_open and original_text != '"' and self._config['parentheses_action'] == 'substitute':
+                if quotes_open and original_text != '"' and parentheses_action == 'substitute':
                     word = '<QQQ>'
-                elif self._config['lemmatize']:
-                    word = token['lemma']
+                elif lemmatize:
+                    word = lemma
                 else:
-                    word = token['word'].lower()
+                    word = word.lower()
 
-                # ignore stopwords
-                if self._config['stop_words'] and self._is_stop_word(word):
-                    do_add = False
+                # filter by POS and ignore stopwords
+                do_add = keep(word, pos)
 
                 # substitute POSes
-                if token['pos'] in self._config['pos_to_substitute']:
-                    word = '<{pos}>'.format(pos=token['pos'])
+                if substitute(pos):
+                    word = '<{pos}>'.format(pos=pos)
 
                 # ignore closing
                 if word == "''":
@@ -321,16 +307,14 @@ class ProcessorTokenize(Processor):
                 if do_add:
                     itemset.append(word)
 
-                previous_char_offset = token['characterOffsetEnd']
-
                 # split on
-                if not quotes_open and (original_text in self._config['split_on'] or (self._config['sentence_split'] and j == len(sentence['tokens'])-1)):
-                    if len(itemset) > self._config['min_length']:
+                if not quotes_open and (original_text in split_on or (sentence_split and j == last)):
+                    if len(itemset) > min_length:
                         itemsets.append(itemset)
                         itemset = Itemset()
                         itemset.label = elem.label
 
-            if len(itemset) > self._config['min_length']:
+            if len(itemset) > min_length:
                 itemsets.append(itemset)
                 itemset = Itemset()
                 itemset.label = elem.label
@@ -347,3 +331,260 @@ class ProcessorTokenize(Processor):
                 new_dataset.append(line)
 
         return new_dataset
+
+
+class ProcessorDeduplicate(Processor):
+    ''' Removes repeated texts or itemsets. Exact mode compares 64 bit hashes of the normalized elements, near mode uses MinHash with LSH banding over their items.'''
+
+    cnt = 0
+
+    # the output depends on the elements seen before
+    cacheable = False
+
+    # MinHash permutations are computed modulo a Mersenne prime
+    _PRIME = (1 << 31) - 1
+
+    def __init__(self, config):
+        super().__init__()
+
+        self._current = None
+
+        # defaults
+        self._config = {
+            'logging': False,
+            'name': 'ProcessorDeduplicate_' + str(ProcessorDeduplicate.cnt),
+            # 'exact' or 'near'
+            'mode': 'exact',
+            # at most 2 * max_entries hashes are kept, the oldest are forgotten
+            'max_entries': 10000000,
+            # near mode: signature length and number of LSH bands. Elements are
+            # candidates with probability 1 - (1 - s^r)^b for Jaccard similarity s
+            'num_perm': 64,
+            'bands': 16,
+            'seed': 1
+        }
+        ProcessorDeduplicate.cnt += 1
+
+        self._config.update(config)
+
+        assert (self._config['mode'] in ['exact', 'near']
+                ), "Unknown deduplication mode."
+        assert (self._config['num_perm'] % self._config['bands'] == 0
+                ), "num_perm must be a multiple of bands."
+
+        rndm = np.random.RandomState(self._config['seed'])
+        self._perm_a = rndm.randint(1, self._PRIME, size=(self._config['num_perm'], 1)).astype(np.uint64)
+        self._perm_b = rndm.randint(0, self._PRIME, size=(self._config['num_perm'], 1)).astype(np.uint64)
+
+        # two generations of hashes bound the memory used
+        self._seen = set()
+        self._seen_old = set()
+
+        self._stats = {
+            'in': {
+                'cnt': 0
+            },
+            'out': {
+                'cnt': 0,
+                'removed': 0
+            }
+        }
+
+    @staticmethod
+    def _hash(string, digest_size=8):
+        return int.from_bytes(hashlib.blake2b(string.encode('utf-8'), digest_size=digest_size).digest(), 'little')
+
+    def _items(self, elem):
+        if isinstance(elem, Itemset):
+            return list(map(str, elem.items))
+        return elem.string.lower().split()
+
+    def _exact_keys(self, elem):
+        if isinstance(elem, Itemset):
+            return [self._hash(' '.join(sorted(self._items(elem))))]
+        return [self._hash(' '.join(self._items(elem)))]
+
+    def _near_keys(self, elem):
+        items = set(self._items(elem))
+        if not items:
+            return self._exact_keys(elem)
+
+        hashes = np.array([self._hash(item, 4) for item in items], dtype=np.uint64) % self._PRIME
+        signature = ((self._perm_a * hashes + self._perm_b) % self._PRIME).min(axis=1).astype(np.uint32)
+
+        return [self._hash(str(band) + ':' + band_signature.tobytes().hex())
+                for band, band_signature in enumerate(np.split(signature, self._config['bands']))]
+
+    def log_elem(self, elem):
+        return False
+
+    def process(self, elem):
+        self._stats['in']['cnt'] += 1
+        self._current = elem
+
+        if self._config['mode'] == 'exact':
+            keys = self._exact_keys(elem)
+        else:
+            keys = self._near_keys(elem)
+
+        duplicate = any(key in self._seen or key in self._seen_old for key in keys)
+
+        self._seen.update(keys)
+        if len(self._seen) > self._config['max_entries']:
+            self._seen_old = self._seen
+            self._seen = set()
+
+        if duplicate:
+            self._stats['out']['removed'] += 1
+            return self.log_elem(elem)
+
+        self._stats['out']['cnt'] += 1
+        return elem
+
+    def process_dataset(self, dataset):
+        assert isinstance(dataset, (TextDataset, ItemsetDataset))
+
+        new_dataset = _empty_like(dataset)
+        for elem in dataset:
+            # empty itemsets are falsy, only False means removed
+            if self.process(elem) is not False:
+                new_dataset.append(elem)
+
+        return new_dataset
+
+
+class ProcessorCache(Processor):
+    ''' Wraps a processor and memoizes its outputs per (element, label) in a bounded LRU cache.
+
+    Only processors whose output depends on the element alone can be wrapped,
+    stateful ones such as ProcessorDeduplicate are refused. Cached outputs are
+    copied in and out. Cache hits are served concurrently, while misses call the
+    wrapped processor one at a time, so it does not need to be thread safe:
+    misses are fully serialized and an expensive backend (eg. CoreNLP) loses
+    all its parallelism behind this wrapper. A miss checks the cache again once
+    it holds the wrapped processor, so concurrent misses on the same element
+    compute it once. The wrapped processor's own _stats only count the misses.
+    '''
+
+    cnt = 0
+
+    def __init__(self, processor, config=None):
+        super().__init__()
+
+        if not processor.cacheable:
+            raise ValueError('{} can not be cached, its output depends on previous elements.'.format(
+                type(processor).__name__))
+
+        self._processor = processor
+
+        # defaults
+        self._config = {
+            'name': 'ProcessorCache_' + str(ProcessorCache.cnt),
+            'capacity': 100000
+        }
+        ProcessorCache.cnt += 1
+
+        if config:
+            self._config.update(config)
+
+        self._cache = collections.OrderedDict()
+        self._lock = threading.Lock()
+        # serializes the calls to the wrapped processor
+        self._process_lock = threading.Lock()
+
+        self._stats = {
+            'in': {
+                'cnt': 0
+            },
+            'cache': {
+                'hits': 0,
+                'misses': 0,
+                'hit_rate': 0.0,
+                'size': 0
+            }
+        }
+
+    @staticmethod
+    def _key(elem):
+        if isinstance(elem, Itemset):
+            return (tuple(elem.items), elem.label)
+        return (elem.string, elem.label)
+
+    @staticmethod
+    def _copy(output):
+        if isinstance(output, list):
+            return [ProcessorCache._copy(e) for e in output]
+        if isinstance(output, Itemset):
+            return Itemset(items=list(output.items), label=output.label, separator=output.separator)
+        if isinstance(output, TextElement):
+            return TextElement(string=output.string, label=output.label)
+        return output
+
+    def _count(self, hit):
+        stats = self._stats['cache']
+        if hit:
+            stats['hits'] += 1
+        else:
+            stats['misses'] += 1
+        stats['hit_rate'] = stats['hits'] / (stats['hits'] + stats['misses'])
+        stats['size'] = len(self._cache)
+
+    def _lookup(self, key):
+        ''' Returns (True, a copy of the cached output) on a hit, (False, None) otherwise '''
+        with self._lock:
+            if key not in self._cache:
+                return False, None
+            self._cache.move_to_end(key)
+            self._count(True)
+            return True, self._copy(self._cache[key])
+
+    def process(self, elem):
+        key = self._key(elem)
+
+        with self._lock:
+            self._stats['in']['cnt'] += 1
+
+        hit, output = self._lookup(key)
+        if hit:
+            return output
+
+        with self._process_lock:
+            # another thread may have computed the same element while this one waited
+            hit, output = self._lookup(key)
+            if hit:
+                return output
+
+            output = self._processor.process(elem)
+
+            with self._lock:
+                self._cache[key] = self._copy(output)
+                if len(self._cache) > self._config['capacity']:
+                    self._cache.popitem(last=False)
+                self._count(False)
+
+        return output
+
+    def process_dataset(self, dataset):
+        assert isinstance(dataset, (TextDataset, ItemsetDataset))
+
+        new_dataset = None
+        for elem in dataset:
+            output = self.process(elem)
+            if output is False or output is None:
+                continue
+
+            if not isinstance(output, list):
+                output = [output]
+            for new_elem in output:
+                if new_dataset is None:
+                    if isinstance(new_elem, Itemset) and isinstance(dataset, ItemsetDataset):
+                        new_dataset = _empty_like(dataset)
+                    elif isinstance(new_elem, Itemset):
+                        new_dataset = ItemsetDataset()
+                    else:
+                        new_dataset = TextDataset()
+                new_dataset.append(new_elem)
+
+        if new_dataset is None:
+            new_dataset = _empty_like(dataset)
+        return new_dataset
@@ -28,6 +28,9 @@ class ToCsv():
 			self.out_file.write(" "+str(itemset.cls))
 		self.out_file.write("\n")
 
+	def flush(self):
+		self.out_file.flush()
+
 	def end(self):
 		return
 
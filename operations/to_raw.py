@@ -28,6 +28,9 @@ class ToRaw():
 		if itemset.label is not None:
 			self.out_file.write(bytes([itemset.label]))
 
+	def flush(self):
+		self.out_file.flush()
+
 	def end(self):
 		return
 
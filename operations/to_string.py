@@ -24,6 +24,9 @@ class ToString():
 		out_string += "\n"
 		self.out_file.write(out_string)
 
+	def flush(self):
+		self.out_file.flush()
+
 	def end(self):
 		return
 
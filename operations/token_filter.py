@@ -0,0 +1,74 @@
+import re
+
+
+class TokenFilter():
+    ''' Decides which tokens are kept by a tokenizer, based on their word and POS tag.
+
+    Stop words and POS tags are kept in frozensets, the rgx: stop words without
+    groups or inline flags are compiled into a single alternation and decisions
+    are memoized per (word, pos).
+    '''
+
+    def __init__(self, stop_words=None, pos_filter=None, pos_to_substitute=None, cache_size=1000000):
+        # POS filter: 'A|B' keeps only A and B, '^A|B' removes A and B
+        self.pos_filter_negative = True
+        self.pos_filter = frozenset()
+        if pos_filter:
+            if pos_filter[0] == '^':
+                self.pos_filter = frozenset(pos_filter[1:].split('|'))
+            else:
+                self.pos_filter_negative = False
+                self.pos_filter = frozenset(pos_filter.split('|'))
+
+        self.pos_to_substitute = frozenset()
+        if pos_to_substitute:
+            self.pos_to_substitute = frozenset(pos_to_substitute.split('|'))
+
+        words = []
+        regexes = []
+        for stop_word in (stop_words or []):
+            m = re.match('^rgx:(.*)', stop_word)
+            if m:
+                regexes.append(m.group(1))
+            else:
+                words.append(stop_word)
+
+        self.stop_words = frozenset(words)
+
+        # patterns without groups or inline flags are merged into one alternation,
+        # the rest are matched on their own so their backreferences and flags hold
+        mergeable = []
+        self.stop_regexes = []
+        for regex in regexes:
+            compiled = re.compile(regex)
+            if compiled.groups == 0 and not re.search(r'\(\?[aiLmsux-]', regex):
+                mergeable.append(regex)
+            else:
+                self.stop_regexes.append(compiled)
+        if mergeable:
+            self.stop_regexes.insert(0, re.compile('|'.join('(?:' + regex + ')' for regex in mergeable)))
+
+        self.cache_size = cache_size
+        self._cache = dict()
+
+    def is_stop_word(self, word):
+        if word in self.stop_words:
+            return True
+        return any(regex.match(word) is not None for regex in self.stop_regexes)
+
+    def keep_pos(self, pos):
+        return (pos in self.pos_filter) != self.pos_filter_negative
+
+    def substitute(self, pos):
+        return pos in self.pos_to_substitute
+
+    def keep(self, word, pos):
+        ''' Returns True if the token passes the POS filter and is not a stop word '''
+        key = (word, pos)
+        decision = self._cache.get(key)
+        if decision is None:
+            decision = self.keep_pos(pos) and not self.is_stop_word(word)
+            if len(self._cache) >= self.cache_size:
+                self._cache.clear()
+            self._cache[key] = decision
+        return decision
@@ -1,3 +1,6 @@
+import time
+import asyncio
+
 from itemizer.element import Itemset
 
 class Parser():
@@ -20,3 +23,116 @@ class Parser():
 
 	def pipe(self, operation_obj):
 		self.connected_pipes.append(operation_obj)
+
+	def flush(self):
+		for pipe in self.connected_pipes:
+			if hasattr(pipe, 'flush'):
+				pipe.flush()
+
+
+class AsyncParser(Parser):
+	""" Parses itemsets from an asyncio byte stream, eg. stdin, a FIFO or a socket. """
+
+	def __init__(self, separator=" ", read_size=2**20, batch_size=10000, queue_size=8, flush_interval=1.0, flush_lines=None):
+		""" Initializes attributes.
+
+		read_size: bytes requested per read.
+		batch_size: maximum lines pushed through the pipes at once.
+		queue_size: batches read ahead; reading stops while the queue is full.
+		flush_interval, flush_lines: the pipes are flushed after this many seconds or lines,
+			None disables the flushes by time or by line count.
+		"""
+		super().__init__(separator)
+		self.read_size = read_size
+		self.batch_size = batch_size
+		self.queue_size = queue_size
+		self.flush_interval = flush_interval
+		self.flush_lines = flush_lines
+
+		self.lines = 0
+
+	async def _read(self, reader, queue):
+		tail = b''
+		try:
+			while True:
+				data = await reader.read(self.read_size)
+				if not data:
+					break
+
+				lines = (tail + data).split(b'\n')
+				tail = lines.pop()
+				# the complete lines of every read are pushed at once
+				for start in range(0, len(lines), self.batch_size):
+					await queue.put(lines[start:start + self.batch_size])
+		except asyncio.CancelledError:
+			raise
+		except Exception:
+			# wake up the consumer, the error is raised when awaiting the reader
+			await queue.put(None)
+			raise
+
+		if tail:
+			await queue.put([tail])
+		await queue.put(None)
+
+	async def parse_stream(self, reader):
+		""" Parses every line of a stream with an async read(n) method, eg. asyncio.StreamReader """
+		queue = asyncio.Queue(maxsize=self.queue_size)
+		producer = asyncio.ensure_future(self._read(reader, queue))
+
+		last_flush = time.monotonic()
+		lines_since_flush = 0
+		try:
+			while True:
+				try:
+					batch = await asyncio.wait_for(queue.get(), timeout=self.flush_interval)
+				except asyncio.TimeoutError:
+					# idle stream: flush what has been parsed so far
+					if lines_since_flush:
+						self.flush()
+						last_flush = time.monotonic()
+						lines_since_flush = 0
+					continue
+				if batch is None:
+					break
+
+				for line in batch:
+					self.parse_line(line.decode('utf-8'))
+				self.lines += len(batch)
+				lines_since_flush += len(batch)
+
+				if ((self.flush_lines is not None and lines_since_flush >= self.flush_lines)
+						or (self.flush_interval is not None
+							and time.monotonic() - last_flush >= self.flush_interval)):
+					self.flush()
+					last_flush = time.monotonic()
+					lines_since_flush = 0
+
+				# let the reader run between batches
+				await asyncio.sleep(0)
+		finally:
+			if not producer.done():
+				producer.cancel()
+
+		await producer
+		self.flush()
+		for pipe in self.connected_pipes:
+			pipe.end()
+
+	async def parse_pipe(self, pipe_file):
+		""" Parses a pipe or FIFO opened in binary mode, eg. sys.stdin.buffer """
+		loop = asyncio.get_running_loop()
+		reader = asyncio.StreamReader(limit=self.read_size)
+		transport, _ = await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), pipe_file)
+		try:
+			await self.parse_stream(reader)
+		finally:
+			transport.close()
+
+	async def parse_unix_socket(self, path=None, sock=None):
+		""" Parses the data received from a Unix socket path or a connected socket """
+		reader, writer = await asyncio.open_unix_connection(path, sock=sock, limit=self.read_size)
+		try:
+			await self.parse_stream(reader)
+		finally:
+			writer.close()
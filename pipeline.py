@@ -0,0 +1,190 @@
+import array
+import tempfile
+
+import numpy as np
+
+from itemizer.element import Itemset, TextElement
+from itemizer.alphabet import Alphabet
+from itemizer.export import NO_LABEL
+
+
+class Pipeline():
+    ''' Fused pipeline from lines of text to encoded itemsets in two passes.
+
+    Pass one (count) streams every element through the processors, counts the
+    alphabet and spills the resulting itemsets to a temporary binary file as
+    provisional ids. Pass two (iter_arrays, to_nparray, to_raw) reads the file
+    back block by block and encodes it with the frozen alphabet. No intermediate
+    dataset is kept in memory.
+
+    The spill file is a sequence of blocks, each one made of int32 arrays:
+    [n_rows, n_values], lengths (n_rows), labels (n_rows), values (n_values).
+    '''
+
+    def __init__(self, processors, keep_n=None, min_frequency=None, block_size=100000, tmp_dir=None):
+        self.processors = processors
+        self.keep_n = keep_n
+        self.min_frequency = min_frequency
+        self.block_size = block_size
+        self.tmp_dir = tmp_dir
+
+        self.alphabet = None
+
+        # provisional ids, in order of appearance
+        self._ids = dict()
+        self._counts = array.array('q')
+        self._remap = None
+        self._spill = None
+        self._n_rows = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+
+    def __len__(self):
+        return self._n_rows
+
+    def close(self):
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+
+    def _process(self, elem):
+        elems = [elem]
+        for processor in self.processors:
+            outputs = []
+            for e in elems:
+                output = processor.process(e)
+                if not output:
+                    continue
+                if isinstance(output, list):
+                    outputs.extend(output)
+                else:
+                    outputs.append(output)
+            elems = outputs
+        return elems
+
+    def _elements(self, source):
+        if isinstance(source, str):
+            with open(source) as fin:
+                for line in fin:
+                    yield TextElement().from_string(line.rstrip('\n'))
+        else:
+            for elem in source:
+                yield elem
+
+    def _write_block(self, lengths, labels, values):
+        header = array.array('i', [len(lengths), len(values)])
+        for arr in (header, lengths, labels, values):
+            arr.tofile(self._spill)
+
+    def count(self, source):
+        ''' First pass over a TextDataset, an iterable of elements or a filename. '''
+        self.close()
+        self._spill = tempfile.TemporaryFile(dir=self.tmp_dir)
+        self._ids = dict()
+        self._counts = array.array('q')
+        self._n_rows = 0
+
+        ids = self._ids
+        counts = self._counts
+        lengths, labels, values = array.array('i'), array.array('i'), array.array('i')
+
+        for elem in self._elements(source):
+            for itemset in self._process(elem):
+                if not isinstance(itemset, Itemset):
+                    raise ValueError('Pipeline processors must produce itemsets.')
+
+                for item in itemset.items:
+                    idx = ids.get(item)
+                    if idx is None:
+                        idx = ids[item] = len(ids)
+                        counts.append(0)
+                    counts[idx] += 1
+                    values.append(idx)
+                lengths.append(len(itemset.items))
+                labels.append(NO_LABEL if itemset.label is None else itemset.label)
+
+                if len(lengths) >= self.block_size:
+                    self._write_block(lengths, labels, values)
+                    self._n_rows += len(lengths)
+                    lengths, labels, values = array.array('i'), array.array('i'), array.array('i')
+
+        if lengths:
+            self._write_block(lengths, labels, values)
+            self._n_rows += len(lengths)
+
+        self._freeze()
+        return self
+
+    def _freeze(self):
+        ''' Builds the alphabet and the map from provisional to translated ids. '''
+        self.alphabet = Alphabet()
+        self.alphabet.counts = dict(zip(self._ids, self._counts))
+        self.alphabet.translate()
+        if self.min_frequency is not None:
+            self.alphabet.keep_min_frequency(self.min_frequency)
+        if self.keep_n is not None:
+            self.alphabet.keep_n(self.keep_n)
+
+        translator = self.alphabet.translator
+        self._remap = np.full(len(self._ids) + 1, -1, dtype=np.int32)
+        for item, idx in self._ids.items():
+            if item in translator:
+                self._remap[idx] = translator[item]
+
+    def iter_arrays(self):
+        ''' Second pass: yields (offsets, values, labels) arrays, one per spilled block. '''
+        if self._spill is None:
+            raise ValueError('Pipeline.count must be run before encoding.')
+
+        self._spill.seek(0)
+        while True:
+            header = np.fromfile(self._spill, dtype=np.int32, count=2)
+            if len(header) < 2:
+                return
+            n_rows, n_values = header
+            lengths = np.fromfile(self._spill, dtype=np.int32, count=n_rows)
+            labels = np.fromfile(self._spill, dtype=np.int32, count=n_rows).astype(np.int64)
+            values = self._remap[np.fromfile(self._spill, dtype=np.int32, count=n_values)]
+
+            # drop the items outside the alphabet
+            rows = np.repeat(np.arange(n_rows), lengths)
+            kept = values >= 0
+            offsets = np.zeros(n_rows + 1, dtype=np.int64)
+            np.cumsum(np.bincount(rows[kept], minlength=n_rows), out=offsets[1:])
+
+            yield offsets, values[kept], labels
+
+    def _dense(self, offsets, values):
+        rows = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+        keys, counts = np.unique(rows * len(self.alphabet) + values, return_counts=True)
+        arr = np.zeros(shape=(len(offsets) - 1, len(self.alphabet)), dtype=np.uint8)
+        arr.reshape(-1)[keys] = np.minimum(counts, 255)
+        return arr
+
+    def to_nparray(self):
+        ''' Returns the uint8 count matrix, as ItemsetDataset.get_nparray. '''
+        arr = np.zeros(shape=(self._n_rows, len(self.alphabet)), dtype=np.uint8)
+        start = 0
+        for offsets, values, labels in self.iter_arrays():
+            arr[start:start + len(labels)] = self._dense(offsets, values)
+            start += len(labels)
+        return arr
+
+    def to_raw(self, filename):
+        ''' Writes the uint8 counts followed by the label byte of every row, as ToRaw. '''
+        with open(filename, 'wb') as fout:
+            for offsets, values, labels in self.iter_arrays():
+                arr = self._dense(offsets, values)
+                if (labels == NO_LABEL).all():
+                    arr.tofile(fout)
+                elif (labels != NO_LABEL).all():
+                    np.hstack((arr, labels.astype(np.uint8)[:, None])).tofile(fout)
+                else:
+                    for row, label in zip(arr, labels):
+                        row.tofile(fout)
+                        if label != NO_LABEL:
+                            fout.write(bytes([label]))
@@ -0,0 +1,150 @@
+import os
+import heapq
+import pickle
+import operator
+import tempfile
+
+from itemizer.element import Itemset, TextElement
+
+# records written to a run per pickled block
+_BLOCK_SIZE = 10000
+
+
+def _key_function(key, kind, separator):
+    ''' Returns a function computing the sort key of a line '''
+    if kind == 'itemset':
+        parse = lambda line: Itemset().from_string(line.rstrip('\n'), separator=separator)
+    elif kind == 'text':
+        parse = lambda line: TextElement().from_string(line.rstrip('\n'))
+    else:
+        raise ValueError('Unknown value for arg kind.')
+
+    if key == 'label':
+        # unlabeled elements go first
+        def label_key(line):
+            label = parse(line).label
+            return -1 if label is None else label
+        return label_key
+    if key == 'length':
+        if kind == 'itemset':
+            return lambda line: len(parse(line))
+        return lambda line: len(parse(line).string)
+    if callable(key):
+        return lambda line: key(parse(line))
+
+    raise ValueError('Unknown value for arg key.')
+
+
+def _write_run(records, tmp_dir):
+    ''' Writes an iterable of records to a closed temporary file, in pickled blocks.
+
+    Runs are only opened while they are merged, so the number of open files is
+    bounded by the merge fan-in and not by the number of runs.
+    '''
+    fd, run = tempfile.mkstemp(prefix='itemizer_run_', dir=tmp_dir)
+    with os.fdopen(fd, 'wb') as fout:
+        block = []
+        for record in records:
+            block.append(record)
+            if len(block) >= _BLOCK_SIZE:
+                pickle.dump(block, fout, protocol=pickle.HIGHEST_PROTOCOL)
+                block = []
+        if block:
+            pickle.dump(block, fout, protocol=pickle.HIGHEST_PROTOCOL)
+    return run
+
+
+def _read_run(run):
+    ''' Yields the records of a run and deletes it once read '''
+    with open(run, 'rb') as fin:
+        try:
+            while True:
+                for record in pickle.load(fin):
+                    yield record
+        except EOFError:
+            pass
+    os.remove(run)
+
+
+def _remove_runs(runs):
+    for run in runs:
+        if os.path.exists(run):
+            os.remove(run)
+
+
+def _lines(filename):
+    with open(filename) as fin:
+        for line in fin:
+            if not line.endswith('\n'):
+                line += '\n'
+            yield line
+
+
+def _write(records, out_filename):
+    with open(out_filename, 'w') as fout:
+        fout.writelines(map(operator.itemgetter(1), records))
+
+
+def _merge_runs(runs, reverse, max_runs, tmp_dir):
+    ''' Merges consecutive groups of max_runs runs until at most max_runs are left '''
+    while len(runs) > max_runs:
+        merged = []
+        try:
+            for start in range(0, len(runs), max_runs):
+                merged.append(_write_run(heapq.merge(*map(_read_run, runs[start:start + max_runs]),
+                                                     key=operator.itemgetter(0), reverse=reverse), tmp_dir))
+        except BaseException:
+            _remove_runs(runs + merged)
+            raise
+        runs = merged
+    return runs
+
+
+def sort_file(in_filename, out_filename, key='label', kind='itemset', separator=' ',
+              reverse=False, max_bytes=64 * 1024 * 1024, max_runs=64, tmp_dir=None):
+    ''' Sorts the lines of an itemset or text file with an external merge sort.
+
+    key is 'label', 'length' or a function of the parsed element. Runs of at most
+    max_bytes of text are sorted in memory, spilled to temporary files and
+    k-way merged, at most max_runs (open files) at a time. The sort is stable.
+    '''
+    if max_runs < 2:
+        raise ValueError('max_runs must be at least 2.')
+    key_fn = _key_function(key, kind, separator)
+
+    runs = []
+    try:
+        records = []
+        size = 0
+        for line in _lines(in_filename):
+            records.append((key_fn(line), line))
+            size += len(line)
+            if size >= max_bytes:
+                records.sort(key=operator.itemgetter(0), reverse=reverse)
+                runs.append(_write_run(records, tmp_dir))
+                records = []
+                size = 0
+
+        records.sort(key=operator.itemgetter(0), reverse=reverse)
+        if not runs:
+            _write(records, out_filename)
+            return
+
+        runs.append(_write_run(records, tmp_dir))
+        runs = _merge_runs(runs, reverse, max_runs, tmp_dir)
+        _write(heapq.merge(*map(_read_run, runs), key=operator.itemgetter(0), reverse=reverse),
+               out_filename)
+    finally:
+        _remove_runs(runs)
+
+
+def merge_files(in_filenames, out_filename, key='label', kind='itemset', separator=' ', reverse=False):
+    ''' k-way merges files that are already sorted by key into out_filename '''
+    key_fn = _key_function(key, kind, separator)
+
+    def keyed(filename):
+        for line in _lines(filename):
+            yield key_fn(line), line
+
+    _write(heapq.merge(*map(keyed, in_filenames), key=operator.itemgetter(0), reverse=reverse),
+           out_filename)